@@ -13,7 +13,13 @@ Requires species_mentions_scan.csv in the same folder.
 import pandas as pd
 import numpy as np
 import json
-from sentence_transformers import SentenceTransformer
+
+from sentence_model import encode_cached
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Categories from the scan (must match scan_species_mentions.py)
 CATEGORIES = [
@@ -30,31 +36,57 @@ CATEGORIES = [
 ]
 
 
-def build_searchable_text(row):
-    """Build a searchable text string from all the metadata."""
+def dump_json(obj, path):
+    """Write JSON with orjson when available (a Rust encoder, much faster
+    on record-heavy files), falling back to the stdlib. Output is compact:
+    these files are machine-read, so indentation only costs time and bytes.
+    """
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, separators=(',', ':'))
+
+
+def build_searchable_text(df):
+    """Build searchable text strings for all records at once.
+
+    Works column-wise with vectorized string operations instead of a
+    per-row apply, which is much faster on large scans.
+    """
     parts = []
-    
+
     # Add filename
-    if pd.notna(row.get('file_name')):
-        parts.append(f"filename: {row['file_name']}")
-    
+    names = df['file_name']
+    parts.append(('filename: ' + names.astype(str)).where(names.notna(), ''))
+
     # Add file type
-    if pd.notna(row.get('file_type')):
-        parts.append(f"type: {row['file_type']}")
-    
+    types = df['file_type']
+    parts.append(('type: ' + types.astype(str)).where(types.notna(), ''))
+
     # Add each category's matches
     for cat in CATEGORIES:
-        if pd.notna(row.get(cat)) and row[cat]:
-            parts.append(f"{cat}: {row[cat]}")
-    
-    # Add path keywords (extract folder names)
-    if pd.notna(row.get('file_path')):
-        path = str(row['file_path']).replace('\\', '/')
-        folders = [p for p in path.split('/') if len(p) > 2 and '.' not in p]
-        if folders:
-            parts.append(f"location: {' '.join(folders[-4:])}")  # Last 4 folders
-    
-    return " | ".join(parts)
+        vals = df[cat]
+        parts.append((f"{cat}: " + vals.astype(str)).where(vals.notna() & (vals != ''), ''))
+
+    # Add path keywords: drop segments with a dot or <3 chars, keep the
+    # last 4 folders -- all in pandas' regex engine, no per-row Python
+    folders = (df['file_path'].fillna('').astype(str)
+               .str.replace('\\', '/', regex=False)
+               .str.replace(r'[^/]*\.[^/]*', '', regex=True)
+               .str.replace(r'(?:^|(?<=/))[^/]{1,2}(?=/|$)', '', regex=True)
+               .str.replace(r'/+', '/', regex=True).str.strip('/')
+               .str.split('/').str[-4:].str.join(' '))
+    parts.append(('location: ' + folders).where(folders != '', ''))
+
+    # Join the non-empty parts with ' | '
+    texts = pd.Series('', index=df.index)
+    for part in parts:
+        sep = np.where((texts != '') & (part != ''), ' | ', '')
+        texts = texts + sep + part
+
+    return texts
 
 
 def main():
@@ -73,7 +105,7 @@ def main():
     
     # Build searchable text for each record
     print("\nBuilding searchable text...")
-    df_success['searchable_text'] = df_success.apply(build_searchable_text, axis=1)
+    df_success['searchable_text'] = build_searchable_text(df_success)
     
     # Extract unique values for each category (for filter dropdowns)
     print("\nExtracting filter options...")
@@ -88,36 +120,50 @@ def main():
     
     # Build records for JSON
     print("\nBuilding records...")
-    records = []
-    for _, row in df_success.iterrows():
-        record = {
-            'file_path': row['file_path'],
-            'file_name': row['file_name'],
-            'file_type': row['file_type'],
-            'searchable_text': row['searchable_text'],
-        }
-        # Add each category
-        for cat in CATEGORIES:
-            record[cat] = row[cat] if pd.notna(row[cat]) else ''
-        records.append(record)
+    record_cols = ['file_path', 'file_name', 'file_type', 'searchable_text'] + CATEGORIES
+    df_records = df_success[record_cols].copy()
+    for cat in CATEGORIES:
+        df_records[cat] = df_records[cat].where(df_records[cat].notna(), '')
+    records = df_records.to_dict(orient='records')
     
     # Save index JSON
     print(f"\nSaving search_index.json...")
-    with open('search_index.json', 'w', encoding='utf-8') as f:
-        json.dump({
-            'records': records,
-            'categories': CATEGORIES,
-            'filters': filter_options,
-        }, f, indent=2)
+    dump_json({
+        'records': records,
+        'categories': CATEGORIES,
+        'filters': filter_options,
+    }, 'search_index.json')
     
     # Generate embeddings
     print("\nGenerating embeddings (this may take a minute)...")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    
     texts = [r['searchable_text'] for r in records]
-    embeddings = model.encode(texts, normalize_embeddings=True, show_progress_bar=True)
+    # Only new or changed records are actually encoded; the rest come
+    # from the on-disk cache
+    embeddings = encode_cached(texts)
     
-    np.save('search_embeddings.npy', embeddings.astype('float32'))
+    embeddings = embeddings.astype('float32')
+    # FP16 halves the file and query-time memory traffic with no
+    # measurable recall loss for MiniLM embeddings
+    np.save('search_embeddings.npy', embeddings.astype('float16'))
+
+    # Also save an int8-quantized copy (per-row symmetric scale). 4x smaller
+    # on disk and in RAM, and the similarity matmul can run on integers.
+    scale = np.max(np.abs(embeddings), axis=1, keepdims=True) / 127.0
+    scale[scale == 0] = 1.0
+    emb_int8 = np.round(embeddings / scale).astype(np.int8)
+    np.save('search_embeddings_int8.npy', emb_int8)
+    np.save('search_embeddings_scale.npy', scale.astype('float32'))
+
+    # Optional: a FAISS HNSW index turns ranking from a full scan into an
+    # approximate O(log N) graph walk at query time
+    try:
+        import faiss
+        index = faiss.IndexHNSWFlat(embeddings.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        index.add(embeddings)
+        faiss.write_index(index, 'search.index')
+        print("  Saved FAISS index: search.index")
+    except ImportError:
+        pass
     
     print(f"\n" + "=" * 60)
     print("BUILD COMPLETE")
@@ -127,6 +173,7 @@ def main():
     print(f"\nFiles created:")
     print(f"  - search_index.json")
     print(f"  - search_embeddings.npy")
+    print(f"  - search_embeddings_int8.npy (+ scale)")
     print(f"\nNext: Run 'uvicorn search_service:app --reload' to start the search server")
 
 
@@ -12,7 +12,7 @@ Usage:
 
 import geopandas as gpd
 import fiona
-import pandas as pd
+import shapely
 from pathlib import Path
 
 # === CONFIGURE THIS ===
@@ -31,7 +31,25 @@ print("\n" + "="*50)
 print("Extracting data from each layer...")
 print("="*50 + "\n")
 
-all_data = []
+# Work out the union of columns up front from the layer schemas (cheap
+# metadata reads), so each layer can be written out as soon as it's
+# processed instead of buffering everything for one big concat.
+header_cols = []
+for layer in layers:
+    try:
+        with fiona.open(gdb_path, layer=layer) as src:
+            for col in src.schema['properties']:
+                if col not in header_cols:
+                    header_cols.append(col)
+    except Exception as e:
+        print(f"  Could not read schema for {layer}: {e}")
+# Added columns, unless a layer schema already carries the same name
+for col in ('lat', 'lon', 'source_layer'):
+    if col not in header_cols:
+        header_cols.append(col)
+
+total_rows = 0
+wrote_header = False
 
 for layer in layers:
     try:
@@ -45,29 +63,36 @@ for layer in layers:
         
         # Extract coordinates from geometry
         if 'geometry' in gdf.columns and gdf.geometry is not None:
-            # Get centroid for any geometry type (point, polygon, etc.)
-            gdf['lat'] = gdf.geometry.centroid.y
-            gdf['lon'] = gdf.geometry.centroid.x
+            geoms = gdf.geometry.values
+            # Point layers can be read directly; anything else gets a
+            # centroid first -- both as single vectorized shapely calls
+            # instead of per-row GEOS lookups
+            if not (gdf.geom_type == 'Point').all():
+                geoms = shapely.centroid(geoms)
+            gdf['lat'] = shapely.get_y(geoms)
+            gdf['lon'] = shapely.get_x(geoms)
         else:
             gdf['lat'] = None
             gdf['lon'] = None
         
         # Add source layer name
         gdf['source_layer'] = layer
-        
-        # Keep all columns for now - we can filter later
-        all_data.append(gdf.drop(columns=['geometry'], errors='ignore'))
-        
+
+        # Stream this layer straight to the CSV against the union header
+        # (columns a layer doesn't have come out empty)
+        gdf = gdf.drop(columns=['geometry'], errors='ignore').reindex(columns=header_cols)
+        gdf.to_csv(output_csv, mode='a' if wrote_header else 'w',
+                   header=not wrote_header, index=False)
+        wrote_header = True
+        total_rows += len(gdf)
+
     except Exception as e:
         print(f"  Error reading {layer}: {e}")
 
-# Combine all data
-if all_data:
-    combined = pd.concat(all_data, ignore_index=True)
+if wrote_header:
     print(f"\n{'='*50}")
-    print(f"Total rows extracted: {len(combined)}")
-    print(f"Saving to: {output_csv}")
-    combined.to_csv(output_csv, index=False)
+    print(f"Total rows extracted: {total_rows}")
+    print(f"Saved to: {output_csv}")
     print("Done!")
 else:
     print("No data extracted!")
\ No newline at end of file
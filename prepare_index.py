@@ -12,163 +12,225 @@ import pandas as pd
 import numpy as np
 import json
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
 
-def clean_text(val):
-    """Convert value to clean string, handling NaN and None."""
-    if pd.isna(val) or val is None:
-        return ""
-    return str(val).strip()
+from sentence_model import encode_cached
 
-def build_searchable_text(record):
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+    pacsv = None
+
+def load_csv(filepath):
+    """Read a metadata CSV with pyarrow's multithreaded SIMD parser when
+    available (several times faster on multi-MB files), else pandas."""
+    if pacsv is not None:
+        try:
+            tbl = pacsv.read_csv(
+                str(filepath),
+                read_options=pacsv.ReadOptions(use_threads=True),
+                convert_options=pacsv.ConvertOptions(
+                    strings_can_be_null=True,
+                    # Keep date columns as text: cleaning expects strings,
+                    # and inferred timestamp columns can't hold ''
+                    column_types={'min_date': pa.string(), 'max_date': pa.string()},
+                ),
+            )
+            return tbl.to_pandas()
+        except pa.ArrowInvalid:
+            # pyarrow rejects ragged rows that pandas pads with NaN
+            pass
+    return pd.read_csv(filepath)
+
+def dump_json(obj, path):
+    """Write JSON with orjson when available (a Rust encoder, much faster
+    on record-heavy files), falling back to the stdlib. Output is compact:
+    these files are machine-read, so indentation only costs time and bytes.
     """
-    Build a weighted searchable text string from record fields.
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, separators=(',', ':'))
+
+def clean_series(s):
+    """Convert a column to clean strings in one vectorized pass, with NaN as ""."""
+    return s.fillna('').astype(str).str.strip()
+
+def clean_columns(df, text_cols, numeric_cols=()):
+    """Clean text columns in place and normalise missing numerics to None.
+
+    Columns absent from the source file are created with empty/None values
+    so every record ends up with the same keys.
+    """
+    for col in text_cols:
+        if col in df.columns:
+            df[col] = clean_series(df[col])
+        else:
+            df[col] = ''
+    for col in numeric_cols:
+        if col in df.columns:
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+        else:
+            df[col] = None
+    return df
+
+def build_searchable_text(df):
+    """
+    Build weighted searchable text strings for all records at once.
     Important fields are repeated to give them more weight in embeddings.
+    Expects text columns to be cleaned already (see clean_columns).
     """
     parts = []
-    
+
     # High weight: filename/layer name (repeat 3x)
-    name = record.get('name', '')
-    if name:
-        parts.extend([name] * 3)
-    
+    parts += [df['name']] * 3
+
     # High weight: species (repeat 2x)
-    species = record.get('species', '')
-    if species:
-        parts.extend([species] * 2)
-    
+    parts += [df['species']] * 2
+
     # Medium weight: activity type
-    activity = record.get('activity', '')
-    if activity:
-        parts.append(activity)
-    
+    parts.append(df['activity'])
+
     # Medium weight: filename tokens (already tokenised)
-    tokens = record.get('filename_tokens', '')
-    if tokens:
-        parts.append(tokens)
-    
+    parts.append(df['filename_tokens'])
+
     # Lower weight: field/column names
-    fields = record.get('fields', '')
-    if fields:
-        parts.append(fields)
-    
-    # Context: file path keywords
-    path = record.get('path', '')
-    if path:
-        # Extract meaningful path segments
-        path_parts = path.replace('\\', '/').split('/')
-        meaningful = [p for p in path_parts if p and not p.startswith('.') and ':' not in p]
-        parts.append(' '.join(meaningful[-4:]))  # Last 4 path segments
-    
-    return ' '.join(parts)
+    parts.append(df['fields'])
+
+    # Context: file path keywords. Drop hidden (dot-prefixed) and
+    # drive-letter segments, keep the last 4 -- all in pandas' regex
+    # engine, no per-row Python
+    meaningful = (df['path'].str.replace('\\', '/', regex=False)
+                  .str.replace(r'(?:^|(?<=/))\.[^/]*(?=/|$)', '', regex=True)
+                  .str.replace(r'(?:^|(?<=/))[^/]*:[^/]*(?=/|$)', '', regex=True)
+                  .str.replace(r'/+', '/', regex=True).str.strip('/')
+                  .str.split('/').str[-4:].str.join(' '))
+    parts.append(meaningful)
+
+    # Join the non-empty parts with spaces
+    texts = pd.Series('', index=df.index)
+    for part in parts:
+        sep = np.where((texts != '') & (part != ''), ' ', '')
+        texts = texts + sep + part
+
+    return texts
 
 def process_csv_xlsx(filepath):
     """Process CSV/XLSX metadata file."""
-    df = pd.read_csv(filepath)
-    records = []
-    
-    for _, row in df.iterrows():
-        record = {
-            'type': 'table',
-            'subtype': clean_text(row.get('file_extension', '')).replace('.', ''),
-            'path': clean_text(row.get('file_path', '')),
-            'name': clean_text(row.get('file_name', '')),
-            'species': clean_text(row.get('Species', '')),
-            'activity': clean_text(row.get('activity', '')),
-            'filename_tokens': clean_text(row.get('filename_tokens', '')),
-            'fields': clean_text(row.get('column_names', '')),
-            'status': clean_text(row.get('status', '')),
-            'row_count': row.get('row_count') if pd.notna(row.get('row_count')) else None,
-            'file_size_mb': row.get('file_size_mb') if pd.notna(row.get('file_size_mb')) else None,
-            'min_date': clean_text(row.get('min_date', '')),
-            'max_date': clean_text(row.get('max_date', '')),
-        }
-        record['searchable_text'] = build_searchable_text(record)
-        records.append(record)
-    
-    return records
+    df = load_csv(filepath)
+    df = df.rename(columns={
+        'file_extension': 'subtype',
+        'file_path': 'path',
+        'file_name': 'name',
+        'Species': 'species',
+        'column_names': 'fields',
+    })
+
+    clean_columns(
+        df,
+        text_cols=['subtype', 'path', 'name', 'species', 'activity',
+                   'filename_tokens', 'fields', 'status', 'min_date', 'max_date'],
+        numeric_cols=['row_count', 'file_size_mb'],
+    )
+    df['type'] = 'table'
+    df['subtype'] = df['subtype'].str.replace('.', '', regex=False)
+    df['searchable_text'] = build_searchable_text(df)
+
+    target_cols = ['type', 'subtype', 'path', 'name', 'species', 'activity',
+                   'filename_tokens', 'fields', 'status', 'row_count',
+                   'file_size_mb', 'min_date', 'max_date', 'searchable_text']
+    return df[target_cols].to_dict(orient='records')
 
 def process_gdb(filepath):
     """Process geodatabase layer metadata file."""
-    df = pd.read_csv(filepath)
-    records = []
-    
-    for _, row in df.iterrows():
-        record = {
-            'type': 'geodatabase',
-            'subtype': 'gdb_layer',
-            'path': clean_text(row.get('geodatabase', '')),
-            'name': clean_text(row.get('layer', '')),
-            'species': clean_text(row.get('Species', '')),
-            'activity': clean_text(row.get('activity', '')),
-            'filename_tokens': clean_text(row.get('first_word', '')),
-            'fields': clean_text(row.get('field_names', '')),
-            'status': clean_text(row.get('status', '')),
-            'feature_count': row.get('feature_count') if pd.notna(row.get('feature_count')) else None,
-            'geometry_types': clean_text(row.get('geometry_types', '')),
-            'crs': clean_text(row.get('crs', '')),
-            'min_date': clean_text(row.get('min_date', '')),
-            'max_date': clean_text(row.get('max_date', '')),
-        }
-        record['searchable_text'] = build_searchable_text(record)
-        records.append(record)
-    
-    return records
+    df = load_csv(filepath)
+    df = df.rename(columns={
+        'geodatabase': 'path',
+        'layer': 'name',
+        'Species': 'species',
+        'first_word': 'filename_tokens',
+        'field_names': 'fields',
+    })
+
+    clean_columns(
+        df,
+        text_cols=['path', 'name', 'species', 'activity', 'filename_tokens',
+                   'fields', 'status', 'geometry_types', 'crs', 'min_date', 'max_date'],
+        numeric_cols=['feature_count'],
+    )
+    df['type'] = 'geodatabase'
+    df['subtype'] = 'gdb_layer'
+    df['searchable_text'] = build_searchable_text(df)
+
+    target_cols = ['type', 'subtype', 'path', 'name', 'species', 'activity',
+                   'filename_tokens', 'fields', 'status', 'feature_count',
+                   'geometry_types', 'crs', 'min_date', 'max_date', 'searchable_text']
+    return df[target_cols].to_dict(orient='records')
 
 def process_shp(filepath):
     """Process shapefile metadata file."""
-    df = pd.read_csv(filepath)
-    records = []
-    
-    for _, row in df.iterrows():
-        record = {
-            'type': 'shapefile',
-            'subtype': 'shp',
-            'path': clean_text(row.get('shapefile_path', '')),
-            'name': clean_text(row.get('layer_name', '')),
-            'species': clean_text(row.get('Species', '')),
-            'activity': clean_text(row.get('activity', '')),
-            'filename_tokens': clean_text(row.get('first_word', '')),
-            'fields': clean_text(row.get('field_names', '')),
-            'status': clean_text(row.get('status', '')),
-            'feature_count': row.get('feature_count') if pd.notna(row.get('feature_count')) else None,
-            'geometry_types': clean_text(row.get('geometry_types', '')),
-            'crs': clean_text(row.get('crs', '')),
-            'min_date': clean_text(row.get('min_date', '')),
-            'max_date': clean_text(row.get('max_date', '')),
-        }
-        record['searchable_text'] = build_searchable_text(record)
-        records.append(record)
-    
-    return records
+    df = load_csv(filepath)
+    df = df.rename(columns={
+        'shapefile_path': 'path',
+        'layer_name': 'name',
+        'Species': 'species',
+        'first_word': 'filename_tokens',
+        'field_names': 'fields',
+    })
+
+    clean_columns(
+        df,
+        text_cols=['path', 'name', 'species', 'activity', 'filename_tokens',
+                   'fields', 'status', 'geometry_types', 'crs', 'min_date', 'max_date'],
+        numeric_cols=['feature_count'],
+    )
+    df['type'] = 'shapefile'
+    df['subtype'] = 'shp'
+    df['searchable_text'] = build_searchable_text(df)
+
+    target_cols = ['type', 'subtype', 'path', 'name', 'species', 'activity',
+                   'filename_tokens', 'fields', 'status', 'feature_count',
+                   'geometry_types', 'crs', 'min_date', 'max_date', 'searchable_text']
+    return df[target_cols].to_dict(orient='records')
 
 def process_images(filepath):
     """Process image metadata file."""
-    df = pd.read_csv(filepath)
-    records = []
-    
-    for _, row in df.iterrows():
-        record = {
-            'type': 'image',
-            'subtype': clean_text(row.get('file_extension', '')).replace('.', ''),
-            'path': clean_text(row.get('image_path', '')),
-            'name': clean_text(row.get('file_name', '')),
-            'species': clean_text(row.get('Species', '')),
-            'activity': clean_text(row.get('activity', '')),
-            'filename_tokens': clean_text(row.get('filename_tokens', '')),
-            'fields': '',  # Images don't have fields
-            'status': clean_text(row.get('status', '')),
-            'file_size_mb': row.get('file_size_mb') if pd.notna(row.get('file_size_mb')) else None,
-            'width_px': row.get('width_px') if pd.notna(row.get('width_px')) else None,
-            'height_px': row.get('height_px') if pd.notna(row.get('height_px')) else None,
-            'camera_make': clean_text(row.get('camera_make', '')),
-            'camera_model': clean_text(row.get('camera_model', '')),
-            'has_gps': row.get('gps_info') == True or str(row.get('gps_info', '')).lower() == 'true',
-        }
-        record['searchable_text'] = build_searchable_text(record)
-        records.append(record)
-    
-    return records
+    df = load_csv(filepath)
+    df = df.rename(columns={
+        'file_extension': 'subtype',
+        'image_path': 'path',
+        'file_name': 'name',
+        'Species': 'species',
+    })
+
+    clean_columns(
+        df,
+        text_cols=['subtype', 'path', 'name', 'species', 'activity',
+                   'filename_tokens', 'status', 'camera_make', 'camera_model'],
+        numeric_cols=['file_size_mb', 'width_px', 'height_px'],
+    )
+    df['type'] = 'image'
+    df['subtype'] = df['subtype'].str.replace('.', '', regex=False)
+    df['fields'] = ''  # Images don't have fields
+    if 'gps_info' in df.columns:
+        df['has_gps'] = (df['gps_info'] == True) | (df['gps_info'].astype(str).str.lower() == 'true')
+    else:
+        df['has_gps'] = False
+    df['searchable_text'] = build_searchable_text(df)
+
+    target_cols = ['type', 'subtype', 'path', 'name', 'species', 'activity',
+                   'filename_tokens', 'fields', 'status', 'file_size_mb',
+                   'width_px', 'height_px', 'camera_make', 'camera_model',
+                   'has_gps', 'searchable_text']
+    return df[target_cols].to_dict(orient='records')
 
 def main():
     data_dir = Path('/mnt/user-data/uploads')
@@ -237,18 +299,17 @@ def main():
     print(f"  Types: {filters['type']}")
     
     # Generate embeddings
-    print("\nLoading sentence transformer model...")
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    
-    print("Generating embeddings...")
+    print("\nGenerating embeddings...")
     texts = [r['searchable_text'] for r in all_records]
-    embeddings = model.encode(texts, normalize_embeddings=True, show_progress_bar=True)
+    # Only new or changed records are actually encoded; the rest come
+    # from the on-disk cache
+    embeddings = encode_cached(texts)
     
     # Save outputs
     print("\nSaving index...")
     
-    # Save embeddings
-    np.save(output_dir / 'embeddings.npy', embeddings.astype('float32'))
+    # Save embeddings (FP16: half the bytes, no measurable recall loss)
+    np.save(output_dir / 'embeddings.npy', embeddings.astype('float16'))
     
     # Save records (without searchable_text to save space)
     records_clean = []
@@ -256,12 +317,10 @@ def main():
         r_clean = {k: v for k, v in r.items() if k != 'searchable_text'}
         records_clean.append(r_clean)
     
-    with open(output_dir / 'records.json', 'w', encoding='utf-8') as f:
-        json.dump(records_clean, f, indent=2)
-    
+    dump_json(records_clean, output_dir / 'records.json')
+
     # Save filter options
-    with open(output_dir / 'filters.json', 'w', encoding='utf-8') as f:
-        json.dump(filters, f, indent=2)
+    dump_json(filters, output_dir / 'filters.json')
     
     # Also save searchable texts for debugging
     with open(output_dir / 'searchable_texts.txt', 'w', encoding='utf-8') as f:
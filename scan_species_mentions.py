@@ -11,15 +11,28 @@ Usage:
 
 Requires:
     pip install pandas geopandas fiona openpyxl PyPDF2 tqdm
+
+Optional (much faster term matching / PDF extraction):
+    pip install pyahocorasick pypdfium2
 """
 
 import os
 import re
 import csv
-from pathlib import Path
+import json
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from datetime import datetime
 from tqdm import tqdm
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -30,6 +43,10 @@ ROOT_PATH = "E:\\"
 # Output file
 OUTPUT_FILE = "species_mentions_scan.csv"
 
+# Sidecar cache of previous results, keyed by (path, size, mtime).
+# Delete the file to force a full rescan.
+CACHE_FILE = "scan_cache.sqlite"
+
 # ============================================================================
 # SEARCH TERMS - ADD YOUR OWN TERMS HERE!
 # ============================================================================
@@ -165,18 +182,16 @@ SEARCH_CATEGORIES = {
     
 }
 
-# File extensions to skip entirely
-SKIP_EXTENSIONS = {
-    # Images
-    '.jpg', '.jpeg', '.png', '.gif', '.tif', '.tiff', '.cr2', '.nef', '.bmp', '.raw',
-    # Audio/Video  
-    '.avi', '.mp4', '.mov', '.wav', '.mp3', '.wmv',
-    # GIS support files (we read .shp directly, which uses .dbf)
-    '.shx', '.prj', '.cpg', '.sbn', '.sbx', '.shp.xml', '.qmd', '.dbf',
-    # Geodatabase support files
-    '.gdbtable', '.gdbtablx', '.gdbindexes', '.atx', '.freelist', '.horizon', '.spx',
-    # Other
-    '.lock', '.xml', '.html', '.htm', '.pptx', '.docx',
+# File extensions we scan, mapped to the reader type used for them.
+# Everything else (images, audio/video, GIS and gdb support files, ...)
+# is skipped automatically.
+EXT_TO_TYPE = {
+    '.shp': 'shapefile',
+    '.xlsx': 'excel',
+    '.xls': 'excel',
+    '.csv': 'csv',
+    '.pdf': 'pdf',
+    '.gpx': 'gpx',
 }
 
 # Maximum file size to read (skip very large files)
@@ -186,34 +201,117 @@ MAX_FILE_SIZE_MB = 500
 MAX_ROWS = 100000
 
 # ============================================================================
-# COMPILE REGEX PATTERNS (don't edit this section)
+# BUILD MATCHER TABLES (don't edit this section)
 # ============================================================================
 
-# Build regex patterns for each category
-CATEGORY_PATTERNS = {}
+# Fallback tables for when pyahocorasick isn't installed: single-word
+# terms become one hash lookup per distinct token in the text, and only
+# the few multi-word terms keep a combined regex per category.
+WORD_TO_CATS = {}
+MULTIWORD_PATTERNS = {}
+MULTIWORD_LOOKUP = {}
 for category, terms in SEARCH_CATEGORIES.items():
-    CATEGORY_PATTERNS[category] = {}
+    multiword = []
     for term in terms:
-        pattern = r'\b' + re.escape(term) + r's?\b'  # Match plurals too
-        CATEGORY_PATTERNS[category][term] = re.compile(pattern, re.IGNORECASE)
+        word = term.lower()
+        if ' ' in word:
+            multiword.append(term)
+            continue
+        for variant in (word, word + 's'):  # Match plurals too
+            WORD_TO_CATS.setdefault(variant, []).append((category, term))
+    if multiword:
+        # Longest first so 'whale shark' wins over 'whale' at the same spot
+        alternation = '|'.join(re.escape(t) for t in sorted(multiword, key=len, reverse=True))
+        MULTIWORD_PATTERNS[category] = re.compile(r'\b(' + alternation + r')s?\b', re.IGNORECASE)
+        MULTIWORD_LOOKUP[category] = {t.lower(): t for t in multiword}
+
+# One tokenizer pass replaces ~200 whole-word regex scans. Underscore is
+# a word character (as in regex \b), so 'ray' does not match in 'x_ray'
+_TOKEN_RE = re.compile(r'[a-z0-9_][a-z0-9_-]*')
+
+
+def _build_automaton():
+    """Build one Aho-Corasick automaton over every term in every category.
+
+    A single linear pass over the text then reports all terms at once,
+    instead of one regex scan per category. Each word maps to the tuple of
+    (category, term) pairs that use it -- some terms (e.g. 'impact')
+    belong to more than one category.
+    """
+    automaton = ahocorasick.Automaton()
+    for category, terms in SEARCH_CATEGORIES.items():
+        for term in terms:
+            word = term.lower()
+            for variant in (word, word + 's'):  # Match plurals too
+                _, owners = automaton.get(variant, (0, ()))
+                automaton.add_word(variant, (len(variant), owners + ((category, term),)))
+    automaton.make_automaton()
+    return automaton
+
+
+# Built once at import, so pool workers forked on Linux share it read-only
+# and spawned workers (Windows) get it when they import this module
+_AUTOMATON = _build_automaton() if ahocorasick is not None else None
+
+
+def _scan_chunk(chunk, results):
+    """Scan one string and add any term hits to the results dict."""
+    if _AUTOMATON is not None:
+        text_lc = chunk.lower()
+        last = len(text_lc) - 1
+        for end, (length, owners) in _AUTOMATON.iter(text_lc):
+            start = end - length + 1
+            # Whole words only: 'ray' must not match inside 'array' or
+            # 'x_ray' (underscore is a word character, same as regex \b)
+            if start > 0:
+                prev = text_lc[start - 1]
+                if prev.isalnum() or prev == '_':
+                    continue
+            if end < last:
+                nxt = text_lc[end + 1]
+                if nxt.isalnum() or nxt == '_':
+                    continue
+            for category, term in owners:
+                results[category].add(term)
+        return
+
+    # Fallback: tokenize once, then single-word terms are set lookups
+    text_lc = chunk.lower()
+    tokens = set(_TOKEN_RE.findall(text_lc))
+    # Hyphenated tokens also count as their parts ('dugong-survey' hits both)
+    for token in [t for t in tokens if '-' in t]:
+        tokens.update(token.split('-'))
+    for word in tokens & WORD_TO_CATS.keys():
+        for category, term in WORD_TO_CATS[word]:
+            results[category].add(term)
+
+    # The few multi-word terms still need a positional scan
+    for category, pattern in MULTIWORD_PATTERNS.items():
+        lookup = MULTIWORD_LOOKUP[category]
+        found = results[category]
+        for match in pattern.finditer(text_lc):
+            found.add(lookup[match.group(1)])
 
 
 def find_matches_in_text(text):
     """
     Search text for all category matches.
+
+    Accepts a single string or a list of strings (e.g. one per column),
+    so readers don't have to concatenate one giant buffer just to scan it.
     Returns dict with category names as keys and sets of found terms as values.
     """
-    if not text or not isinstance(text, str):
-        return {cat: set() for cat in SEARCH_CATEGORIES}
-    
-    results = {}
-    for category, patterns in CATEGORY_PATTERNS.items():
-        found = set()
-        for term, pattern in patterns.items():
-            if pattern.search(text):
-                found.add(term)
-        results[category] = found
-    
+    results = {cat: set() for cat in SEARCH_CATEGORIES}
+
+    if isinstance(text, str):
+        text = [text]
+    elif not isinstance(text, list):
+        return results
+
+    for chunk in text:
+        if chunk and isinstance(chunk, str):
+            _scan_chunk(chunk, results)
+
     return results
 
 
@@ -222,30 +320,30 @@ def find_matches_in_text(text):
 # ============================================================================
 
 def read_shapefile(shp_path):
-    """Read a shapefile attribute table and return all text content."""
+    """Read a shapefile attribute table and return its text, one string per column."""
     try:
         import geopandas as gpd
         
         # Read without geometry for speed
         gdf = gpd.read_file(shp_path, ignore_geometry=True, rows=MAX_ROWS)
         
-        # Combine all text columns into one big string
+        # Combine all text columns, one joined string per column
         text_parts = []
         for col in gdf.columns:
             # Add column name
             text_parts.append(str(col))
-            # Add values from string columns
+            # Join string-column values in one vectorized pass
             if gdf[col].dtype == 'object':
-                text_parts.extend(gdf[col].dropna().astype(str).tolist())
-        
-        return ' '.join(text_parts)
+                text_parts.append(gdf[col].dropna().astype(str).str.cat(sep=' '))
+
+        return text_parts
     
     except Exception as e:
         return f"ERROR: {e}"
 
 
 def read_geodatabase(gdb_path):
-    """Read all layers from a geodatabase and return all text content."""
+    """Read all layers from a geodatabase and return their text as a list of strings."""
     try:
         import fiona
         import geopandas as gpd
@@ -262,24 +360,51 @@ def read_geodatabase(gdb_path):
                 for col in gdf.columns:
                     text_parts.append(str(col))
                     if gdf[col].dtype == 'object':
-                        text_parts.extend(gdf[col].dropna().astype(str).tolist())
+                        text_parts.append(gdf[col].dropna().astype(str).str.cat(sep=' '))
             except Exception as layer_err:
                 continue
         
-        return ' '.join(text_parts)
+        return text_parts
     
     except Exception as e:
         return f"ERROR: {e}"
 
 
+# Strips XML tags (and their attributes) so markup like count="5" in the
+# sheet XML can't trigger the 'count' search term
+_XML_TAG = re.compile(rb'<[^>]*>')
+
+
 def read_excel(xlsx_path):
-    """Read an Excel file and return all text content."""
+    """Read an Excel file and return all text content.
+
+    For .xlsx the cell text is read straight out of the zip container
+    (shared strings plus sheet XML), skipping DataFrame construction
+    entirely. Legacy .xls files still go through pandas.
+    """
     try:
+        import zipfile
+
+        if zipfile.is_zipfile(xlsx_path):
+            text_parts = []
+            with zipfile.ZipFile(xlsx_path) as zf:
+                for name in zf.namelist():
+                    if name == 'xl/sharedStrings.xml' or (
+                            name.startswith('xl/worksheets/') and name.endswith('.xml')):
+                        # Cap each member's decompressed size: sheet XML
+                        # can expand far past the on-disk file size
+                        with zf.open(name) as member:
+                            raw = member.read(MAX_FILE_SIZE_MB * 1024 * 1024)
+                        xml = _XML_TAG.sub(b' ', raw)
+                        text_parts.append(xml.decode('utf-8', errors='replace'))
+            return text_parts
+
+        # Legacy .xls: not a zip container, parse with pandas
         import pandas as pd
-        
+
         xlsx = pd.ExcelFile(xlsx_path)
         text_parts = []
-        
+
         for sheet_name in xlsx.sheet_names:
             try:
                 text_parts.append(sheet_name)
@@ -287,54 +412,58 @@ def read_excel(xlsx_path):
                 for col in df.columns:
                     text_parts.append(str(col))
                     if df[col].dtype == 'object':
-                        text_parts.extend(df[col].dropna().astype(str).tolist())
+                        text_parts.append(df[col].dropna().astype(str).str.cat(sep=' '))
             except:
                 continue
-        
-        return ' '.join(text_parts)
-    
+
+        return text_parts
+
     except Exception as e:
         return f"ERROR: {e}"
 
 
 def read_csv_file(csv_path):
-    """Read a CSV file and return all text content."""
+    """Read a CSV file's raw text (no parsing needed for term matching)."""
     try:
-        import pandas as pd
-        
-        # Try different encodings
-        for encoding in ['utf-8', 'latin-1', 'cp1252']:
-            try:
-                df = pd.read_csv(csv_path, encoding=encoding, nrows=MAX_ROWS, on_bad_lines='skip')
-                break
-            except:
-                continue
-        else:
-            return None
-        
-        text_parts = []
-        for col in df.columns:
-            text_parts.append(str(col))
-            if df[col].dtype == 'object':
-                text_parts.extend(df[col].dropna().astype(str).tolist())
-        
-        return ' '.join(text_parts)
-    
+        # The matcher only needs the characters, so skip pandas entirely
+        with open(csv_path, 'rb') as f:
+            data = f.read(MAX_FILE_SIZE_MB * 1024 * 1024)
+        return data.decode('utf-8', errors='replace')
+
     except Exception as e:
         return f"ERROR: {e}"
 
 
 def read_pdf(pdf_path):
-    """Read a PDF file and return all text content."""
+    """Read a PDF file and return its text, one string per page."""
     try:
+        text_parts = []
+
+        try:
+            # pypdfium2 wraps Google's PDFium (C++) and extracts text an
+            # order of magnitude faster than PyPDF2
+            import pypdfium2 as pdfium
+
+            pdf = pdfium.PdfDocument(pdf_path)
+            # Limit pages for very large PDFs
+            for i in range(min(len(pdf), 100)):
+                try:
+                    page_text = pdf[i].get_textpage().get_text_bounded()
+                    if page_text:
+                        text_parts.append(page_text)
+                except Exception:
+                    continue
+            return text_parts
+        except ImportError:
+            pass
+
         from PyPDF2 import PdfReader
-        
+
         reader = PdfReader(pdf_path)
-        text_parts = []
-        
+
         # Limit pages for very large PDFs
         max_pages = min(len(reader.pages), 100)
-        
+
         for i in range(max_pages):
             try:
                 page_text = reader.pages[i].extract_text()
@@ -343,7 +472,7 @@ def read_pdf(pdf_path):
             except:
                 continue
         
-        return ' '.join(text_parts)
+        return text_parts
     
     except Exception as e:
         return f"ERROR: {e}"
@@ -363,92 +492,126 @@ def read_gpx(gpx_path):
 # ============================================================================
 
 def get_files_to_scan(root_path):
-    """Walk directory tree and return list of files to scan."""
-    files_to_scan = []
-    gdb_folders_seen = set()
-    
+    """Walk directory tree and return list of files to scan.
+
+    Uses os.scandir directly so each entry's type, name and size come from
+    a single syscall -- noticeably cheaper than os.walk plus a separate
+    os.path.getsize on slow external/network drives.
+
+    Enumeration is syscall-bound rather than CPU-bound (the GIL is
+    released during scandir and stat), so directories are handed to a
+    small pool of threads; on external/network drives this hides the
+    per-directory round-trip latency.
+    """
     print(f"Finding files in {root_path}...")
-    
-    for dirpath, dirnames, filenames in os.walk(root_path):
-        current_path = Path(dirpath)
-        
-        # If this is a .gdb folder, add it and skip contents
-        if current_path.suffix.lower() == '.gdb':
-            if str(current_path) not in gdb_folders_seen:
-                gdb_folders_seen.add(str(current_path))
-                files_to_scan.append({
-                    'path': str(current_path),
-                    'type': 'geodatabase',
-                    'name': current_path.name
-                })
-            # Don't descend into .gdb folder
-            dirnames.clear()
-            continue
-        
-        # Skip if we're inside a .gdb folder (shouldn't happen but just in case)
-        is_inside_gdb = any(p.suffix.lower() == '.gdb' for p in current_path.parents)
-        if is_inside_gdb:
-            continue
-        
-        for filename in filenames:
-            filepath = os.path.join(dirpath, filename)
-            ext = os.path.splitext(filename)[1].lower()
-            
-            # Skip unwanted extensions
-            if ext in SKIP_EXTENSIONS:
-                continue
-            
-            # Get file size
+
+    num_workers = min(32, (os.cpu_count() or 4) * 4)
+    dir_queue = queue.Queue()
+    dir_queue.put(root_path)
+
+    def walk_worker(files_to_scan):
+        while True:
+            dirpath = dir_queue.get()
+            if dirpath is None:
+                dir_queue.task_done()
+                return
             try:
-                size_mb = os.path.getsize(filepath) / (1024 * 1024)
-                if size_mb > MAX_FILE_SIZE_MB:
+                scan_dir(dirpath, files_to_scan)
+            finally:
+                dir_queue.task_done()
+
+    def scan_dir(dirpath, files_to_scan):
+        try:
+            entries = os.scandir(dirpath)
+        except OSError:
+            return
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        # Geodatabases are folders: record them once and
+                        # don't descend into their contents
+                        if entry.name.lower().endswith('.gdb'):
+                            files_to_scan.append({
+                                'path': entry.path,
+                                'type': 'geodatabase',
+                                'name': entry.name
+                            })
+                        else:
+                            dir_queue.put(entry.path)
+                        continue
+
+                    # rpartition is a plain string split -- no need for
+                    # splitext's path-aware edge cases on a bare filename
+                    stem, dot, suffix = entry.name.rpartition('.')
+                    ext = '.' + suffix.lower() if dot else ''
+
+                    # Determine file type; unknown extensions are skipped
+                    file_type = EXT_TO_TYPE.get(ext)
+                    if file_type is None:
+                        continue
+
+                    # Size comes from the DirEntry's cached stat, so this
+                    # doesn't cost another syscall round-trip
+                    st = entry.stat()
+                    size_mb = st.st_size / (1024 * 1024)
+                    if size_mb > MAX_FILE_SIZE_MB:
+                        continue
+
+                    files_to_scan.append({
+                        'path': entry.path,
+                        'type': file_type,
+                        'name': entry.name,
+                        'size_mb': size_mb,
+                        # Identity for the scan cache
+                        'size': st.st_size,
+                        'mtime_ns': st.st_mtime_ns,
+                    })
+                except OSError:
                     continue
-            except:
-                continue
-            
-            # Determine file type
-            file_type = None
-            if ext == '.shp':
-                file_type = 'shapefile'
-            elif ext in ['.xlsx', '.xls']:
-                file_type = 'excel'
-            elif ext == '.csv':
-                file_type = 'csv'
-            elif ext == '.pdf':
-                file_type = 'pdf'
-            elif ext == '.gpx':
-                file_type = 'gpx'
-            
-            if file_type:
-                files_to_scan.append({
-                    'path': filepath,
-                    'type': file_type,
-                    'name': filename
-                })
-    
+
+    # Per-thread result lists merged at the end: no locking on the hot path
+    thread_lists = [[] for _ in range(num_workers)]
+    threads = [
+        threading.Thread(target=walk_worker, args=(thread_lists[i],), daemon=True)
+        for i in range(num_workers)
+    ]
+    for t in threads:
+        t.start()
+
+    # join() returns once every queued directory has been processed,
+    # including ones the workers discovered and pushed back
+    dir_queue.join()
+    for _ in threads:
+        dir_queue.put(None)
+    for t in threads:
+        t.join()
+
+    files_to_scan = []
+    for lst in thread_lists:
+        files_to_scan.extend(lst)
     return files_to_scan
 
 
+# Reader dispatch for scan_file, keyed by the walker's file types
+READERS = {
+    'shapefile': read_shapefile,
+    'geodatabase': read_geodatabase,
+    'excel': read_excel,
+    'csv': read_csv_file,
+    'pdf': read_pdf,
+    'gpx': read_gpx,
+}
+
+
 def scan_file(file_info):
     """Scan a single file for matches in all categories."""
     filepath = file_info['path']
     file_type = file_info['type']
-    
+
     # Read file content based on type
-    text = None
-    
-    if file_type == 'shapefile':
-        text = read_shapefile(filepath)
-    elif file_type == 'geodatabase':
-        text = read_geodatabase(filepath)
-    elif file_type == 'excel':
-        text = read_excel(filepath)
-    elif file_type == 'csv':
-        text = read_csv_file(filepath)
-    elif file_type == 'pdf':
-        text = read_pdf(filepath)
-    elif file_type == 'gpx':
-        text = read_gpx(filepath)
+    reader = READERS.get(file_type)
+    text = reader(filepath) if reader else None
     
     # Check for errors
     if text and isinstance(text, str) and text.startswith("ERROR:"):
@@ -461,7 +624,7 @@ def scan_file(file_info):
         }
         # Add empty columns for each category
         for category in SEARCH_CATEGORIES:
-            result[category] = ''
+            result[category] = ()
         return result
     
     # Find matches in all categories
@@ -477,13 +640,30 @@ def scan_file(file_info):
         'error': '',
     }
     
+    # Keep match terms as tuples; sorting and joining into display
+    # strings happens once, at CSV-write time
     for category in SEARCH_CATEGORIES:
         combined = matches_from_content[category] | matches_from_path[category]
-        result[category] = ', '.join(sorted(combined)) if combined else ''
-    
+        result[category] = tuple(combined) if combined else ()
+
     return result
 
 
+def open_scan_cache():
+    """Open (creating if needed) the sidecar cache of previous results.
+
+    Rows are keyed by (path, size, mtime), so an unchanged file's result
+    -- including cached errors -- is reused on the next run and only
+    new or modified files are actually read.
+    """
+    conn = sqlite3.connect(CACHE_FILE)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache ("
+        "path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, result TEXT)"
+    )
+    return conn
+
+
 def main():
     print("=" * 60)
     print("NEOM File Content Scanner")
@@ -507,64 +687,119 @@ def main():
         print(f"  {t}: {c}")
     print()
     
-    # Scan each file
-    results = []
+    # Scan files in parallel -- each file is independent, so this scales
+    # with core count. Results are streamed to the CSV as they arrive so
+    # memory stays flat in file count and a crash leaves a usable partial
+    # output; only counters and a small sample survive the loop.
+    total_scanned = 0
     errors = 0
     files_with_matches = 0
-    
-    print("Scanning files...")
-    for file_info in tqdm(files, desc="Progress"):
-        result = scan_file(file_info)
-        results.append(result)
-        
-        if result['status'] == 'error':
-            errors += 1
-        # Check if any category has matches
-        has_match = any(result.get(cat) for cat in SEARCH_CATEGORIES)
-        if has_match:
-            files_with_matches += 1
-    
+    category_counts = {cat: 0 for cat in SEARCH_CATEGORIES}
+    sample_findings = []
+
+    # Largest inputs first (geodatabases count as largest) so a big PDF
+    # or gdb picked up late can't leave one worker running alone at the end
+    files.sort(key=lambda f: f.get('size_mb', float('inf')), reverse=True)
+
+    # Split off files whose (path, size, mtime) matches a cached result.
+    # Geodatabase folders carry no size/mtime and are always rescanned.
+    cache = open_scan_cache()
+    cached_results = []
+    to_scan = []
+    for file_info in files:
+        mtime_ns = file_info.get('mtime_ns')
+        if mtime_ns is not None:
+            row = cache.execute(
+                "SELECT result FROM cache WHERE path=? AND size=? AND mtime=?",
+                (file_info['path'], file_info['size'], mtime_ns)).fetchone()
+            if row is not None:
+                cached_results.append(json.loads(row[0]))
+                continue
+        to_scan.append(file_info)
+    if cached_results:
+        print(f"  {len(cached_results)} unchanged files served from {CACHE_FILE}")
+
     # Build CSV fieldnames dynamically
     fieldnames = ['file_path', 'file_name', 'file_type', 'status', 'error'] + list(SEARCH_CATEGORIES.keys())
-    
-    # Write results to CSV
-    print(f"\nWriting results to {OUTPUT_FILE}...")
-    with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(results)
-    
+
+    print(f"Scanning files (streaming results to {OUTPUT_FILE})...")
+    pending_inserts = 0
+    # csv.writer with pre-ordered list rows skips DictWriter's per-row
+    # dict-to-list conversion; the 1 MiB buffer batches write syscalls
+    with open(OUTPUT_FILE, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            # map preserves input order, so zip pairs each fresh result
+            # with the file_info it came from
+            fresh = zip(to_scan, executor.map(scan_file, to_scan, chunksize=32))
+            stream = chain(((None, r) for r in cached_results), fresh)
+            for file_info, result in tqdm(stream, total=len(files), desc="Progress"):
+                if file_info is not None and file_info.get('mtime_ns') is not None:
+                    cache.execute(
+                        "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                        (file_info['path'], file_info['size'],
+                         file_info['mtime_ns'], json.dumps(result)))
+                    pending_inserts += 1
+                    if pending_inserts % 1000 == 0:
+                        cache.commit()
+                row = []
+                for k in fieldnames:
+                    v = result.get(k, '')
+                    # Category matches arrive as tuples (lists when they
+                    # come back from the json cache)
+                    if isinstance(v, (tuple, list)):
+                        v = ', '.join(sorted(v))
+                    row.append(v)
+                writer.writerow(row)
+                total_scanned += 1
+                # Keep partial output durable in case of a crash mid-scan
+                if total_scanned % 1000 == 0:
+                    f.flush()
+
+                if result['status'] == 'error':
+                    errors += 1
+                has_match = False
+                for cat in SEARCH_CATEGORIES:
+                    if result.get(cat):
+                        category_counts[cat] += 1
+                        has_match = True
+                if has_match:
+                    files_with_matches += 1
+                    if len(sample_findings) < 10:
+                        sample_findings.append(result)
+
+    cache.commit()
+    cache.close()
+
     # Summary
     print()
     print("=" * 60)
     print("SCAN COMPLETE")
     print("=" * 60)
-    print(f"Total files scanned: {len(results)}")
+    print(f"Total files scanned: {total_scanned}")
     print(f"Files with matches: {files_with_matches}")
     print(f"Errors: {errors}")
     print(f"Output saved to: {OUTPUT_FILE}")
     print(f"End time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
+
     # Show category stats
     print()
     print("Matches by category:")
     print("-" * 40)
     for cat in SEARCH_CATEGORIES:
-        count = sum(1 for r in results if r.get(cat))
-        print(f"  {cat}: {count} files")
-    
+        print(f"  {cat}: {category_counts[cat]} files")
+
     # Show some example findings
     print()
     print("Sample findings (first 10 files with matches):")
     print("-" * 60)
-    count = 0
-    for r in results:
-        matches = {cat: r[cat] for cat in SEARCH_CATEGORIES if r.get(cat)}
-        if matches and count < 10:
-            print(f"\n{r['file_name']}")
-            for cat, terms in matches.items():
-                print(f"  {cat}: {terms}")
-            count += 1
+    for r in sample_findings:
+        print(f"\n{r['file_name']}")
+        for cat in SEARCH_CATEGORIES:
+            if r.get(cat):
+                print(f"  {cat}: {', '.join(sorted(r[cat]))}")
 
 
 if __name__ == "__main__":
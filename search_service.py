@@ -4,11 +4,18 @@ NEOM File Search Service v2
 - Filter by species, places, survey types, and more
 """
 
+import functools
 import json
 import re
+from collections import defaultdict
 from typing import Optional
 
-from fastapi import FastAPI, Query
+try:
+    import regex as _re  # PCRE-style engine with a much faster matcher
+except ImportError:
+    _re = re
+
+from fastapi import Depends, FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
@@ -39,8 +46,85 @@ with open("search_index.json", encoding="utf-8") as f:
 print(f"Loaded {len(records)} records")
 print(f"Categories: {categories}")
 
-embeddings = np.load("search_embeddings.npy")
-print(f"Loaded embeddings: {embeddings.shape}")
+# Inverted index, built once at startup: each filter becomes a hash lookup
+# plus set intersection instead of a substring scan over every record
+inverted = {cat: defaultdict(set) for cat in categories}
+by_file_type = defaultdict(set)
+for i, rec in enumerate(records):
+    # One precomputed haystack per record, so include/exclude filters
+    # cost a single regex search instead of two
+    rec['_all'] = rec.get('searchable_text', '') + '\n' + rec['file_path']
+    by_file_type[rec['file_type']].add(i)
+    for cat in categories:
+        for term in rec.get(cat, '').lower().split(', '):
+            if term:
+                inverted[cat][term].add(i)
+
+# Prefer the int8-quantized artifacts when the build produced them: a
+# quarter of the fp32 memory traffic, and per-row scales restore (near-)
+# exact cosine scores after an integer matmul
+embeddings = None
+try:
+    # mmap: pages fault in on first use and the OS shares them across
+    # forked uvicorn workers, so N workers don't cost N copies in RSS
+    emb_int8 = np.load("search_embeddings_int8.npy", mmap_mode='r')
+    emb_scale = np.load("search_embeddings_scale.npy").ravel().astype(np.float32)
+    print(f"Loaded int8 embeddings: {emb_int8.shape}")
+except OSError:
+    emb_int8 = None
+    emb_scale = None
+    embeddings = np.load("search_embeddings.npy", mmap_mode='r')
+    if embeddings.dtype != np.float32:
+        # A float16 build must be widened for the BLAS matmul anyway,
+        # which forces the copy mmap would otherwise avoid
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    print(f"Loaded embeddings: {embeddings.shape}")
+
+
+def _similarities(q_vec, indices=None):
+    """Cosine scores of the query against all records, or a subset."""
+    if emb_int8 is not None:
+        mat, scales = emb_int8, emb_scale
+        if indices is not None:
+            mat = np.take(mat, indices, axis=0)
+            scales = np.take(scales, indices)
+        q_scale = float(np.max(np.abs(q_vec))) / 127.0
+        if q_scale == 0.0:
+            return np.zeros(len(mat), dtype=np.float32)
+        q_int8 = np.round(q_vec / q_scale).astype(np.int8)
+        # int32 accumulation: 384 * 127^2 would overflow anything narrower
+        sims_int = np.matmul(mat, q_int8, dtype=np.int32)
+        return sims_int.astype(np.float32) * (scales * q_scale)
+
+    if indices is not None:
+        return np.take(embeddings, indices, axis=0) @ q_vec
+    return embeddings @ q_vec
+
+
+def parse_filters(request: Request):
+    """Pull active category filters straight out of the query string.
+
+    One pass over request.query_params instead of ten separately declared
+    (and separately validated) Query parameters, so requests only pay for
+    the filters they actually use.
+    """
+    qp = request.query_params
+    return {cat: qp[cat] for cat in categories if qp.get(cat)}
+
+
+@functools.lru_cache(maxsize=512)
+def _compile(pattern):
+    """Compile a user-supplied filter pattern once per distinct string.
+
+    The frontend re-fires the same include/exclude patterns as the user
+    types, so the cache makes recompilation free across requests. Invalid
+    patterns return None -- also cached, so a bad pattern that keeps
+    getting re-sent doesn't re-raise on every request.
+    """
+    try:
+        return _re.compile(pattern, _re.IGNORECASE)
+    except (re.error, _re.error):
+        return None
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -61,16 +145,7 @@ def get_filters():
 @app.get("/api/search")
 def search(
     q: str = "",
-    marine_mammals: Optional[str] = None,
-    sharks_rays: Optional[str] = None,
-    reptiles: Optional[str] = None,
-    fish: Optional[str] = None,
-    birds: Optional[str] = None,
-    invertebrates_habitat: Optional[str] = None,
-    survey_types: Optional[str] = None,
-    places: Optional[str] = None,
-    data_types: Optional[str] = None,
-    conservation: Optional[str] = None,
+    category_filters: dict = Depends(parse_filters),
     file_type: Optional[str] = None,
     include: Optional[str] = None,
     exclude: Optional[str] = None,
@@ -78,74 +153,68 @@ def search(
 ):
     """
     Search files with semantic ranking and category filtering.
+    Category filters are passed as query parameters named after the
+    categories themselves (e.g. ?places=sindalah).
     """
-    
-    # Collect category filters
-    category_filters = {
-        'marine_mammals': marine_mammals,
-        'sharks_rays': sharks_rays,
-        'reptiles': reptiles,
-        'fish': fish,
-        'birds': birds,
-        'invertebrates_habitat': invertebrates_habitat,
-        'survey_types': survey_types,
-        'places': places,
-        'data_types': data_types,
-        'conservation': conservation,
-    }
-    
-    # Start with all indices
-    candidate_indices = list(range(len(records)))
-    
-    # Apply category filters
+
+    # None means "no filter applied yet" (all records)
+    candidate_set = None
+
+    # Apply category filters via the inverted index
     for cat, filter_val in category_filters.items():
-        if filter_val:
-            # Check if the filter value appears in the record's category field
-            candidate_indices = [
-                i for i in candidate_indices 
-                if filter_val.lower() in records[i].get(cat, '').lower()
-            ]
-    
+        matched = inverted[cat].get(filter_val.lower(), set())
+        candidate_set = matched if candidate_set is None else candidate_set & matched
+
     # Apply file type filter
     if file_type:
-        candidate_indices = [
-            i for i in candidate_indices 
-            if records[i]['file_type'] == file_type
-        ]
+        matched = by_file_type.get(file_type, set())
+        candidate_set = matched if candidate_set is None else candidate_set & matched
+
+    if candidate_set is None:
+        candidate_indices = list(range(len(records)))
+    else:
+        candidate_indices = sorted(candidate_set)
     
     # Apply regex include filter
     if include:
-        try:
-            r_inc = re.compile(include, re.IGNORECASE)
-            candidate_indices = [
-                i for i in candidate_indices 
-                if r_inc.search(records[i]['searchable_text']) or r_inc.search(records[i]['file_path'])
-            ]
-        except re.error as e:
-            return {"error": f"Include regex error: {e}"}
-    
+        r_inc = _compile(include)
+        if r_inc is None:
+            return {"error": f"Include regex error: invalid pattern {include!r}"}
+        candidate_indices = [
+            i for i in candidate_indices
+            if r_inc.search(records[i]['_all'])
+        ]
+
     # Apply regex exclude filter
     if exclude:
-        try:
-            r_exc = re.compile(exclude, re.IGNORECASE)
-            candidate_indices = [
-                i for i in candidate_indices 
-                if not (r_exc.search(records[i]['searchable_text']) or r_exc.search(records[i]['file_path']))
-            ]
-        except re.error as e:
-            return {"error": f"Exclude regex error: {e}"}
+        r_exc = _compile(exclude)
+        if r_exc is None:
+            return {"error": f"Exclude regex error: invalid pattern {exclude!r}"}
+        candidate_indices = [
+            i for i in candidate_indices
+            if not r_exc.search(records[i]['_all'])
+        ]
     
     # Semantic ranking or alphabetical fallback
     if q.strip():
         q_emb = embed(q)
         
         if candidate_indices:
-            candidate_embeddings = embeddings[candidate_indices]
-            sims = (candidate_embeddings @ q_emb.T).ravel()
-            
-            sorted_order = np.argsort(-sims)
+            q_vec = q_emb.ravel().astype(np.float32)
+            if len(candidate_indices) > 0.5 * len(records):
+                # Barely-filtered query: one matvec over the whole matrix
+                # beats copying most of it out row by row first
+                sims = _similarities(q_vec)[candidate_indices]
+            else:
+                sims = _similarities(q_vec, candidate_indices)
+
+            # Select the top `limit` in O(N), then sort just those --
+            # a full argsort pays O(N log N) for rows we never return
+            k = max(0, min(limit, len(sims)))
+            top_k = np.argpartition(-sims, k - 1)[:k] if k else np.empty(0, dtype=int)
+            sorted_order = top_k[np.argsort(-sims[top_k])]
             ranked_indices = [candidate_indices[i] for i in sorted_order]
-            ranked_scores = [float(sims[i]) for i in sorted_order]
+            ranked_scores = [float(s) for s in sims[sorted_order]]
         else:
             ranked_indices = []
             ranked_scores = []
@@ -176,30 +245,26 @@ def search(
         results.append(result)
     
     return {
-        'total_matches': len(ranked_indices),
+        'total_matches': len(candidate_indices),
         'showing': len(results),
         'results': results
     }
 
 
+# The index never changes while the server runs, so the stats response
+# can be computed once at load. The inverted index already holds the
+# record-id sets per file type and per category term.
+_stats = {
+    'total_files': len(records),
+    'by_type': {ft: len(ids) for ft, ids in sorted(by_file_type.items())},
+    'by_category': {
+        cat: len(set().union(*inverted[cat].values())) if inverted[cat] else 0
+        for cat in categories
+    },
+}
+
+
 @app.get("/api/stats")
 def get_stats():
     """Return index statistics."""
-    type_counts = {}
-    category_counts = {cat: 0 for cat in categories}
-    
-    for rec in records:
-        # Count file types
-        ft = rec['file_type']
-        type_counts[ft] = type_counts.get(ft, 0) + 1
-        
-        # Count categories with data
-        for cat in categories:
-            if rec.get(cat):
-                category_counts[cat] += 1
-    
-    return {
-        'total_files': len(records),
-        'by_type': type_counts,
-        'by_category': category_counts,
-    }
+    return _stats
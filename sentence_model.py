@@ -1,6 +1,156 @@
+import functools
+import hashlib
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+
+@functools.lru_cache(maxsize=1)
+def get_model():
+    """Load the embedding model once per process.
+
+    Pins torch to every CPU core, picks CUDA automatically when available,
+    and prefers the ONNX backend on CPU (sentence-transformers caches the
+    export on disk, so repeated runs skip download and graph construction).
+    Falls back to the default backend if onnxruntime/optimum aren't
+    installed.
+    """
+    torch.set_num_threads(os.cpu_count())
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    if device == 'cpu':
+        try:
+            return SentenceTransformer(MODEL_NAME, backend="onnx", device=device)
+        except Exception as e:
+            print(f"ONNX backend unavailable ({e}), using default backend")
+    return SentenceTransformer(MODEL_NAME, device=device)
+
+
+# Micro-batching: FastAPI serves requests on a thread pool, so under load
+# several queries hit embed() at once. A short collection window lets one
+# model.encode forward pass serve all of them, which scales throughput
+# roughly with the batch size at similar per-query latency.
+_BATCH_WINDOW_S = 0.005
+
+_batch_queue = queue.Queue()
+_batch_thread = None
+_batch_start_lock = threading.Lock()
+
+
+class _PendingQuery:
+    __slots__ = ('text', 'event', 'result', 'error')
+
+    def __init__(self, text):
+        self.text = text
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _batch_worker():
+    # First call triggers the (lru_cached) model load, so the server
+    # starts serving non-search routes while weights are still loading
+    try:
+        model = get_model()
+    except Exception as e:
+        # If the worker died here, every embed() caller would block on
+        # its event forever; fail queued and future queries loudly instead
+        while True:
+            p = _batch_queue.get()
+            p.error = e
+            p.event.set()
+    while True:
+        pending = [_batch_queue.get()]
+        # Collect whatever else arrives within the batching window
+        deadline = time.monotonic() + _BATCH_WINDOW_S
+        while True:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                pending.append(_batch_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        try:
+            embs = model.encode(
+                [p.text for p in pending],
+                batch_size=len(pending),
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+            )
+        except Exception as e:
+            for p in pending:
+                p.error = e
+                p.event.set()
+            continue
+
+        for p, emb in zip(pending, embs):
+            p.result = emb.reshape(1, -1)
+            p.event.set()
+
+
+def _ensure_batch_worker():
+    global _batch_thread
+    if _batch_thread is None:
+        with _batch_start_lock:
+            if _batch_thread is None:
+                _batch_thread = threading.Thread(target=_batch_worker, daemon=True)
+                _batch_thread.start()
+
 
 def embed(q):
-    return model.encode([q], normalize_embeddings=True).astype("float32")
+    """Embed one query, transparently batching concurrent callers."""
+    _ensure_batch_worker()
+    pending = _PendingQuery(q)
+    _batch_queue.put(pending)
+    pending.event.wait()
+    if pending.error is not None:
+        raise pending.error
+    # encode with normalize_embeddings already returns float32 -- no copy
+    return pending.result
+
+
+def encode_cached(texts, cache_file='emb_cache.npz', show_progress_bar=True):
+    """Encode texts, reusing cached embeddings for unchanged entries.
+
+    Embeddings are cached on disk keyed by a BLAKE2b hash of each text
+    (hashing is ~GB/s, negligible next to encoding), so incremental index
+    rebuilds only pay for new or edited records. Only keys still in use
+    are written back, which keeps the cache from growing without bound.
+    """
+    keys = [hashlib.blake2b(t.encode('utf-8'), digest_size=16).hexdigest() for t in texts]
+
+    cache = {}
+    if os.path.exists(cache_file):
+        try:
+            with np.load(cache_file) as npz:
+                cache = {k: npz[k] for k in npz.files}
+        except Exception as e:
+            print(f"Ignoring unreadable embedding cache ({e})")
+
+    missing = [i for i, k in enumerate(keys) if k not in cache]
+    if missing:
+        m = get_model()
+        new_embeddings = m.encode(
+            [texts[i] for i in missing],
+            batch_size=128 if m.device.type == 'cuda' else 64,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=show_progress_bar,
+        )
+        for i, emb in zip(missing, new_embeddings):
+            cache[keys[i]] = emb.astype('float32')
+        np.savez(cache_file, **{k: cache[k] for k in set(keys)})
+    else:
+        print(f"  All {len(texts)} embeddings served from {cache_file}")
+
+    if not texts:
+        return np.zeros((0, 384), dtype='float32')
+    return np.stack([cache[k] for k in keys])